@@ -1,3 +1,5 @@
+import os
+
 TOKEN = ""  # Replace with your new token
 CHANNEL_ID = ""
 DB_CONFIG = {
@@ -7,3 +9,5 @@ DB_CONFIG = {
 }
 
 DB_NAME="knightwatch"
+
+DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL", "")
@@ -1,20 +1,47 @@
 
 import requests
-DISCORD_WEBHOOK_URL = "https://discord.com/api/webhooks/1340321553774018571/Vj4LV6lSZzVIb5ClrmfbgTy7br15KYHrmMFCc6kiMPCV9cLCeHJ959ifyoPxMlg_a7NC"
+from requests.adapters import HTTPAdapter
+from credentials import DISCORD_WEBHOOK_URL
+
+# Discord rejects message content longer than this
+DISCORD_MESSAGE_LIMIT = 2000
+
+# Shared session so webhook posts reuse the keep-alive TLS connection
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
 
 # Function to send a message to Discord
 def send_discord_message(message):
+    if not DISCORD_WEBHOOK_URL:
+        return
     data = {
         "content": message,
         "username": "YoloBot"
     }
     try:
-        response = requests.post(DISCORD_WEBHOOK_URL, json=data)
+        response = _session.post(DISCORD_WEBHOOK_URL, json=data, timeout=5)
         if response.status_code != 204:
             print(f"Failed to send Discord notification: {response.status_code}")
     except Exception as e:
         print(f"Error sending Discord notification: {e}")
 
 
+# Function to pack several notifications into as few Discord messages as possible
+def chunk_messages(messages, separator="\n---\n", limit=DISCORD_MESSAGE_LIMIT):
+    chunks = []
+    current = ""
+    for message in messages:
+        message = message[:limit]
+        if current and len(current) + len(separator) + len(message) <= limit:
+            current += separator + message
+        else:
+            if current:
+                chunks.append(current)
+            current = message
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 if __name__ == '__main__':
     pass
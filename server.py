@@ -3,14 +3,19 @@ import os
 import re
 import time
 import logging
+import mmap
 import psutil
-import subprocess
-from datetime import datetime
-from typing import Optional, Dict, Any
+import queue
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Dict, Any, Iterator, List, Pattern, Tuple
 import pymysql
 from pymysql import Error
-from discord_message import DISCORD_WEBHOOK_URL, send_discord_message  # Ensure this is installed
-from credentials import DB_CONFIG, DB_NAME
+from dbutils.pooled_db import PooledDB
+from discord_messages import chunk_messages, send_discord_message
+from credentials import DB_CONFIG, DB_NAME, DISCORD_WEBHOOK_URL
 
 
 # Configure logging
@@ -23,21 +28,108 @@ logger = logging.getLogger(__name__)
 
 # In-memory state
 script_status: Dict[int, Dict[str, Any]] = {}
+# PIDs already inspected and found not to be a tracked script, mapped to
+# their create_time so a reused PID is inspected again
+seen_pids: Dict[int, Optional[float]] = {}
+
+# Fields fetched only for processes that pass the Python name check;
+# AccessDenied fields come back as None
+SCRIPT_ATTRS = ["cmdline", "cwd"]
+# Timestamp format used in alerts and DB rows
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Interpreter process names: python, python3, python3.11, python.exe, python3.11.exe;
+# rejects pythonw, ipython and other tools whose names merely contain "python"
+_PY_NAME_RE = re.compile(r"python(\d+(\.\d+)*)?(\.exe)?")
+# Number of monitor ticks between psutil process cache purges
+CACHE_CLEAR_INTERVAL = 100
+
+# Core counts do not change while the monitor runs
+LOGICAL_CORES = psutil.cpu_count(logical=True)
+PHYSICAL_CORES = psutil.cpu_count(logical=False)
+
+# Last RAM/drive sample; metrics are only needed when a script starts/stops
+RESOURCES_TTL = 30
+_last_resources: Dict[str, Any] = {"ts": 0.0, "value": None}
+
+# Local IP lookup cache as (timestamp, value); adapters rarely change
+IP_CACHE_TTL = 60
+_ip_cache: Tuple[float, Optional[str]] = (0.0, None)
+
+# Scrapy spider class declaration; {name} is filled with the escaped spider name
+_SPIDER_TEMPLATE = rb"class\s+\w+.*?scrapy\.Spider.*?:\s*[\s\S]*?name\s*=\s*[\'\"]{name}[\'\"]"
+# Cheap substring check that rules out files without a Spider subclass
+_SPIDER_MARKER = b"scrapy.Spider"
+# is_spider_in_file results as (mtime_ns, found), keyed by (file_path, spider_name);
+# oldest entries are evicted past SPIDER_FILE_CACHE_SIZE
+SPIDER_FILE_CACHE_SIZE = 2048
+_spider_file_cache: Dict[Tuple[str, str], Tuple[int, bool]] = {}
+_spider_file_cache_lock = threading.Lock()
+# Scrapy project roots already located, keyed by start dir; misses are not kept
+_project_roots: Dict[str, str] = {}
+# Spider files already located, keyed by (spiders_dir, spider_name); misses are not kept
+_spider_file_by_name: Dict[Tuple[str, str], str] = {}
+# Threads used to read candidate spider files in parallel
+SPIDER_SCAN_WORKERS = 8
+# Created on first spider lookup rather than at import
+_spider_scan_pool: Optional[ThreadPoolExecutor] = None
+
+# Side-effect events (Discord posts, DB writes) handled off the monitor loop;
+# bounded so a Discord/DB outage cannot grow memory without limit
+EVENT_QUEUE_SIZE = 1000
+EVENTS: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+# Seconds to wait for queued events to be handled when the monitor exits
+EVENT_DRAIN_TIMEOUT = 15
+_workers_started = False
+
+# DB writes get their own queue and a single worker that batches them:
+# up to DB_BATCH_SIZE rows or DB_BATCH_WINDOW seconds per round trip
+DB_BATCH_SIZE = 50
+DB_BATCH_WINDOW = 0.1
+DB_EVENTS: "queue.Queue[Tuple[Any, ...]]" = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+INSERT_EVENT_SQL = """
+    INSERT INTO script_event (event_type, ip, pid, script_path, start_time, resources_info)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+UPDATE_EVENT_SQL = """
+    UPDATE script_event
+    SET event_type = %s, end_time = %s, resources_info = %s, updated_at = CURRENT_TIMESTAMP
+    WHERE pid = %s AND event_type = 'start'
+"""
+
+# Shared MySQL connection pool, created on first use
+_db_pool: Optional[PooledDB] = None
+_db_pool_lock = threading.Lock()
 
 def get_db_connection():
-    connection = pymysql.connect(
-        host=DB_CONFIG['host'],  # Replace with your database host
-        user=DB_CONFIG['user'],  # Replace with your database username
-        password=DB_CONFIG['password'],  # Replace with your database password
-        database=DB_NAME  # Replace with your database name
-    )
-    return connection
+    """Borrow a connection from the shared pool; close() returns it to the pool."""
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            _db_pool = PooledDB(
+                creator=pymysql,
+                mincached=2,
+                maxcached=5,
+                maxconnections=10,
+                blocking=True,
+                host=DB_CONFIG['host'],  # Replace with your database host
+                user=DB_CONFIG['user'],  # Replace with your database username
+                password=DB_CONFIG['password'],  # Replace with your database password
+                database=DB_NAME  # Replace with your database name
+            )
+    return _db_pool.connection()
 
 def find_scrapy_project_root(start_dir: str) -> Optional[str]:
     """Locate Scrapy project root by searching for scrapy.cfg."""
+    known = _project_roots.get(start_dir)
+    if known and os.path.exists(os.path.join(known, "scrapy.cfg")):
+        return known
+    _project_roots.pop(start_dir, None)
+
     current_dir = start_dir
     while True:
         if os.path.exists(os.path.join(current_dir, "scrapy.cfg")):
+            _project_roots[start_dir] = current_dir
             return current_dir
         parent_dir = os.path.dirname(current_dir)
         if parent_dir == current_dir:
@@ -45,41 +137,112 @@ def find_scrapy_project_root(start_dir: str) -> Optional[str]:
         current_dir = parent_dir
 
 
+def _iter_py(root: str) -> Iterator[str]:
+    """Yield .py file paths under root using scandir's cached entry types."""
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _iter_py(entry.path)
+                elif entry.name.endswith(".py") and entry.is_file():
+                    yield entry.path
+    except OSError as e:
+        logger.warning(f"Cannot scan directory {root}: {e}")
+
+
+def _get_spider_scan_pool() -> ThreadPoolExecutor:
+    """Return the spider scan thread pool, creating it on first use."""
+    global _spider_scan_pool
+    if _spider_scan_pool is None:
+        _spider_scan_pool = ThreadPoolExecutor(max_workers=SPIDER_SCAN_WORKERS, thread_name_prefix="spider-scan")
+    return _spider_scan_pool
+
+
 def find_spider_file_by_name(spiders_dir: str, spider_name: str) -> Optional[str]:
     """Locate spider file containing the specified spider name."""
-    for root, _, files in os.walk(spiders_dir):
-        for file in files:
-            if file.endswith(".py"):
-                file_path = os.path.join(root, file)
-                if is_spider_in_file(file_path, spider_name):
-                    return file_path
+    key = (spiders_dir, spider_name)
+    known = _spider_file_by_name.get(key)
+    # Re-checked through the mtime-keyed file cache, so an edited file is rescanned
+    if known and is_spider_in_file(known, spider_name):
+        return known
+    _spider_file_by_name.pop(key, None)
+
+    candidates = list(_iter_py(spiders_dir))
+    # Read candidates concurrently so disk latency overlaps; keep walk order
+    results = _get_spider_scan_pool().map(lambda path: is_spider_in_file(path, spider_name), candidates)
+    for file_path, found in zip(candidates, results):
+        if found:
+            _spider_file_by_name[key] = file_path
+            return file_path
     return None
 
 
+@lru_cache(maxsize=128)
+def _spider_pattern(spider_name: str) -> Pattern[bytes]:
+    """Compile the bytes spider class pattern once per spider name."""
+    return re.compile(
+        _SPIDER_TEMPLATE.replace(b"{name}", re.escape(spider_name.encode("utf-8"))), re.DOTALL
+    )
+
+
 def is_spider_in_file(file_path: str, spider_name: str) -> bool:
     """Check if a spider with the given name exists in the file."""
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            pattern = rf"class\s+\w+.*?scrapy\.Spider.*?:\s*[\s\S]*?name\s*=\s*[\'\"]{spider_name}[\'\"]"
-            return re.search(pattern, content, re.DOTALL) is not None
+        key = (file_path, spider_name)
+        mtime = os.stat(file_path).st_mtime_ns
+        cached = _spider_file_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                found = False
+            else:
+                # Search the mapped file directly instead of decoding it
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    found = (
+                        mm.find(_SPIDER_MARKER) != -1
+                        and _spider_pattern(spider_name).search(mm) is not None
+                    )
+        with _spider_file_cache_lock:
+            _spider_file_cache.pop(key, None)
+            _spider_file_cache[key] = (mtime, found)
+            while len(_spider_file_cache) > SPIDER_FILE_CACHE_SIZE:
+                del _spider_file_cache[next(iter(_spider_file_cache))]
+        return found
     except Exception as e:
         logger.error(f"Error reading file {file_path}: {e}")
         return False
 
 
-def get_script_path(proc: psutil.Process) -> Optional[str]:
-    """Determine script path for Python processes."""
+def is_python_process(proc: psutil.Process) -> bool:
+    """Match Python interpreters by process name, falling back to the exe basename."""
     try:
-        cmdline = proc.cmdline()
-        cwd = proc.cwd()
+        name = proc.name()
+    except psutil.AccessDenied:
+        name = ""
+    if not name:
+        try:
+            name = os.path.basename(proc.exe())
+        except psutil.AccessDenied:
+            return False
+    return _PY_NAME_RE.fullmatch(name.lower()) is not None
+
+
+def get_script_path(info: Dict[str, Any]) -> Optional[str]:
+    """Determine script path for Python processes from prefetched process info."""
+    try:
+        cmdline = info["cmdline"] or []
+        if len(cmdline) < 2:
+            # Bare interpreter, nothing to resolve
+            return None
+        cwd = info["cwd"]
 
         # Scrapy spider detection
         if "-m" in cmdline and "scrapy" in cmdline and "crawl" in cmdline:
             try:
                 crawl_idx = cmdline.index("crawl")
                 spider_name = cmdline[crawl_idx + 1]
-                project_root = find_scrapy_project_root(cwd)
+                project_root = find_scrapy_project_root(cwd) if cwd else None
 
                 if not project_root:
                     return f"Spider: {spider_name} (Project root not found)"
@@ -97,52 +260,71 @@ def get_script_path(proc: psutil.Process) -> Optional[str]:
         for arg in cmdline:
             if arg.endswith(".py") and os.path.isabs(arg):
                 return os.path.abspath(arg)
-        if len(cmdline) > 1 and cmdline[0].endswith("python") and cmdline[1].endswith(".py"):
-            return os.path.abspath(os.path.join(proc.cwd(), cmdline[1]))
+        if len(cmdline) > 1 and cmdline[0].endswith("python") and cmdline[1].endswith(".py") and cwd:
+            return os.path.abspath(os.path.join(cwd, cmdline[1]))
 
         # Interactive session detection
         if "-i" in cmdline or not any(arg.endswith(".py") for arg in cmdline):
             return "<interactive>"
 
-    except (psutil.AccessDenied, psutil.NoSuchProcess) as e:
-        logger.warning(f"Process access denied: {e}")
     except Exception as e:
         logger.error(f"Unexpected error in get_script_path: {e}")
     return None
 
 
-def check_system_resources() -> Dict[str, Any]:
-    """Collect system resource metrics."""
+def check_system_resources(cpu_percent: float) -> Dict[str, Any]:
+    """Collect system resource metrics; RAM/drive stats are reused for RESOURCES_TTL."""
+    now = time.time()
+    if _last_resources["value"] and now - _last_resources["ts"] < RESOURCES_TTL:
+        return _with_cpu(_last_resources["value"], cpu_percent)
+
     try:
         ram = psutil.virtual_memory()
-        cpu = psutil.cpu_times_percent()
-        drives = psutil.disk_partitions()
 
-        return {
+        drives = []
+        for d in psutil.disk_partitions(all=False):
+            if os.name == "nt" and "cdrom" in d.opts:
+                continue
+            usage = psutil.disk_usage(d.mountpoint)
+            drives.append(
+                {
+                    "device": d.device,
+                    "total_gb": round(usage.total / (1024 ** 3), 2),
+                    "used_gb": round(usage.used / (1024 ** 3), 2),
+                    "percent": usage.percent,
+                }
+            )
+
+        resources = {
             "ram": {
                 "total_gb": round(ram.total / (1024 ** 3), 2),
                 "used_gb": round(ram.used / (1024 ** 3), 2),
                 "percent": ram.percent,
             },
-            "cpu": {
-                "usage_percent": psutil.cpu_percent(),
-                "logical_cores": psutil.cpu_count(logical=True),
-                "physical_cores": psutil.cpu_count(logical=False),
-            },
-            "drives": [
-                {
-                    "device": d.device,
-                    "total_gb": round(psutil.disk_usage(d.mountpoint).total / (1024 ** 3), 2),
-                    "used_gb": round(psutil.disk_usage(d.mountpoint).used / (1024 ** 3), 2),
-                    "percent": psutil.disk_usage(d.mountpoint).percent,
-                }
-                for d in drives
-                if not (os.name == "nt" and "cdrom" in d.opts)
-            ],
+            "drives": drives,
         }
+        _last_resources["ts"] = now
+        _last_resources["value"] = resources
+        return _with_cpu(resources, cpu_percent)
     except Exception as e:
         logger.error(f"Error checking system resources: {e}")
-        return {}
+        # Same shape as a real sample so event handling never hits a KeyError
+        return _with_cpu(
+            {"ram": {"total_gb": None, "used_gb": None, "percent": "N/A"}, "drives": []},
+            cpu_percent,
+        )
+
+
+def _with_cpu(resources: Dict[str, Any], cpu_percent: float) -> Dict[str, Any]:
+    """Return a copy of cached resource stats with the current CPU sample added."""
+    return {
+        **resources,
+        "cpu": {
+            "usage_percent": cpu_percent,
+            "logical_cores": LOGICAL_CORES,
+            "physical_cores": PHYSICAL_CORES,
+        },
+    }
 
 
 def send_discord_alert(message: str) -> None:
@@ -154,151 +336,301 @@ def send_discord_alert(message: str) -> None:
         logger.error(f"Discord notification failed: {e} in {get_local_ip()}")   
 
 
-def monitor_scripts() -> None:
-    """Main monitoring loop."""
-    logger.info("Starting script monitoring service")
+def enqueue_event(kind: str, payload: Any) -> None:
+    """Hand a side-effect to the background workers without blocking."""
+    try:
+        if kind == "db":
+            DB_EVENTS.put_nowait(payload)
+        else:
+            EVENTS.put_nowait((kind, payload))
+    except queue.Full:
+        logger.warning(f"Event queue full, dropping {kind} event")
+
 
+def _event_worker() -> None:
+    """Consume queued events and perform the Discord side-effects."""
     while True:
+        kind, payload = EVENTS.get()
         try:
-            # Get running scripts
-            running_scripts = []
-            for proc in psutil.process_iter(["pid", "name", "cmdline"]):
-                if "python" in proc.info["name"].lower():
-                    script_path = get_script_path(proc)
+            if kind == "discord":
+                send_discord_alert(payload)
+            else:
+                logger.warning(f"Unknown event kind: {kind}")
+        except Exception:
+            logger.exception(f"Failed to handle {kind} event")
+        finally:
+            EVENTS.task_done()
+
+
+def _db_worker() -> None:
+    """Drain queued DB events in short bursts and write each burst in one batch."""
+    while True:
+        batch = [DB_EVENTS.get()]
+        deadline = time.monotonic() + DB_BATCH_WINDOW
+        while len(batch) < DB_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(DB_EVENTS.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            log_script_events(batch)
+        except Exception:
+            logger.exception(f"Failed to write {len(batch)} DB events")
+        finally:
+            for _ in batch:
+                DB_EVENTS.task_done()
+
+
+def start_event_workers() -> None:
+    """Start the background Discord/DB workers once."""
+    global _workers_started
+    if _workers_started:
+        return
+    _workers_started = True
+    # One consumer per queue keeps alerts and DB rows in the order they were queued
+    threading.Thread(target=_event_worker, name="event-worker", daemon=True).start()
+    threading.Thread(target=_db_worker, name="db-worker", daemon=True).start()
+
+
+def drain_event_queues(timeout: float = EVENT_DRAIN_TIMEOUT) -> None:
+    """Wait up to timeout seconds for queued Discord/DB events to be handled."""
+    deadline = time.monotonic() + timeout
+    for events in (EVENTS, DB_EVENTS):
+        # Queue.join() has no timeout, so wait on it from a helper thread
+        waiter = threading.Thread(target=events.join, daemon=True)
+        waiter.start()
+        waiter.join(max(0.0, deadline - time.monotonic()))
+        if waiter.is_alive():
+            logger.warning(f"Exiting with {events.qsize()} queued events unhandled")
+
+
+def flush_discord_alerts(messages: List[str]) -> None:
+    """Queue buffered notifications as few combined Discord messages."""
+    for chunk in chunk_messages(messages):
+        enqueue_event("discord", chunk)
+    messages.clear()
+
+
+def format_duration(seconds: float) -> str:
+    """Format elapsed seconds as H:MM:SS."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+
+def monitor_scripts() -> None:
+    """Main monitoring loop."""
+    logger.info("Starting script monitoring service")
+    iteration = 0
+    # Reused across ticks to avoid reallocating per-iteration containers
+    notifications: List[str] = []
+    running_scripts: List[Dict[str, Any]] = []
+    current_pids = set()
+    live_pids = set()
+
+    start_event_workers()
+    try:
+        while True:
+            # Resolved once per tick; get_local_ip() never raises
+            local_ip = get_local_ip()
+            try:
+                iteration += 1
+                if iteration % CACHE_CLEAR_INTERVAL == 0 and hasattr(psutil.process_iter, "cache_clear"):
+                    # Drop dead PIDs from psutil's internal Process cache
+                    psutil.process_iter.cache_clear()
+
+                # Sampled every tick so the value covers the last interval only
+                cpu_percent = psutil.cpu_percent()
+
+                # Get running scripts; only PIDs not seen before are inspected.
+                # (pid, create_time) identifies a process, so reused PIDs count as new.
+                notifications.clear()
+                running_scripts.clear()
+                current_pids.clear()
+                live_pids.clear()
+                for proc in psutil.process_iter():
+                    pid = proc.pid
+                    try:
+                        create_time = proc.create_time()
+                    except psutil.NoSuchProcess:
+                        continue
+                    except psutil.AccessDenied:
+                        create_time = None
+                    live_pids.add(pid)
+
+                    tracked = script_status.get(pid)
+                    if tracked is not None and tracked["create_time"] == create_time:
+                        current_pids.add(pid)
+                        continue
+                    if pid in seen_pids and seen_pids[pid] == create_time:
+                        continue
+
+                    try:
+                        if not is_python_process(proc):
+                            seen_pids[pid] = create_time
+                            continue
+                        info = proc.as_dict(attrs=SCRIPT_ATTRS, ad_value=None)
+                    except psutil.NoSuchProcess:
+                        live_pids.discard(pid)
+                        continue
+                    script_path = get_script_path(info)
                     if script_path and script_path != "<interactive>":
                         running_scripts.append(
                             {
-                                "pid": proc.info["pid"],
+                                "pid": pid,
+                                "create_time": create_time,
                                 "script_path": script_path,
-                                "ip": get_local_ip(),
+                                "ip": local_ip,
                             }
                         )
-
-            # Process system metrics
-            resources = check_system_resources()
-
-            # Handle started scripts
-            for script in running_scripts:
-                pid = script["pid"]
-                if pid not in script_status:
-                    script_status[pid] = {
-                        "script_path": script["script_path"],
-                        "start_time": datetime.now(),
-                    }
-                    drives = ''
-                    for drive in resources['drives']:
-                        drives += f'{drive["device"]} {drive["percent"]}% '
-
-                    send_discord_alert(
-                        f"🟢 **Script Started**\n"
-                        f"Path: `{script['script_path']}`\n"
-                        f"Time: `{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}`\n"
-                        f"IP: `{script['ip']}`\n"
-                        f"RAM: {resources['ram']['percent']}%\n"
-                        f"CPU: {resources['cpu']['usage_percent']}%\n"
-                        f"Drives: {drives}"
-                    )
-                    log_script_event("start",script['ip'], str(script_status[pid]), script_status[pid]["script_path"], script_status[pid]["start_time"], resources)
-
-            # Handle stopped scripts
-            current_pids = {s["pid"] for s in running_scripts}
-            for pid in list(script_status.keys()):
-                if pid not in current_pids:
-                    duration = datetime.now() - script_status[pid]["start_time"]
-                    end_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    send_discord_alert(
+                    else:
+                        seen_pids[pid] = create_time
+
+                # Forget memoized PIDs whose process has exited
+                for pid in seen_pids.keys() - live_pids:
+                    del seen_pids[pid]
+
+                stopped_pids = [pid for pid in script_status if pid not in current_pids]
+                if not running_scripts and not stopped_pids:
+                    # Nothing started or stopped, so no metrics to report
+                    time.sleep(4)
+                    continue
+
+                # Process system metrics
+                resources = check_system_resources(cpu_percent)
+                t_now = time.time()
+                now_str = time.strftime(TIME_FORMAT, time.localtime(t_now))
+                drives = " ".join(f'{d["device"]} {d["percent"]}%' for d in resources.get("drives", []))
+
+                # Handle stopped scripts first so a reused PID can start again below
+                for pid in stopped_pids:
+                    duration = format_duration(t_now - script_status[pid]["start_time"])
+                    notifications.append(
                         f"🔴 **Script Stopped**\n"
-                        f"IP: {str(get_local_ip())}\n"
+                        f"IP: {local_ip}\n"
                         f"Path: `{script_status[pid]['script_path']}`\n"
-                        f"Duration: {str(duration).split('.')[0]}"
+                        f"Duration: {duration}"
                     )
-                    log_script_event("end",str(get_local_ip()), str(script_status[pid]), script_status[pid]["script_path"], end_time, resources)
+                    enqueue_event("db", ("end", local_ip, str(script_status[pid]), script_status[pid]["script_path"], now_str, resources))
                     del script_status[pid]
 
-            time.sleep(4)  # Reduced frequency for production
-
-        except KeyboardInterrupt:
-            logger.info("Monitoring stopped by user")
-            break
-        except Exception as e:
-            logger.error(f"Critical monitoring error: {e}")
-            send_discord_alert(f"🚨 **Monitoring Error**\n{str(e)} in {str(get_local_ip())}")
-            time.sleep(60)  # Safety sleep on critical failure
-
-
-def log_script_event(event_type: str,localip : str, pid: str, path: str, time: str, resources_info: dict) -> None:
-    """Log script events to the database."""
-    connection = get_db_connection()
-    if not connection:
-        return
-
-    try:
-        cursor = connection.cursor()
-
+                # Handle started scripts
+                for script in running_scripts:
+                    pid = script["pid"]
+                    if pid not in script_status:
+                        script_status[pid] = {
+                            "script_path": script["script_path"],
+                            "create_time": script["create_time"],
+                            "start_time": t_now,
+                        }
+                        notifications.append(
+                            f"🟢 **Script Started**\n"
+                            f"Path: `{script['script_path']}`\n"
+                            f"Time: `{now_str}`\n"
+                            f"IP: `{script['ip']}`\n"
+                            f"RAM: {resources['ram']['percent']}%\n"
+                            f"CPU: {resources['cpu']['usage_percent']}%\n"
+                            f"Drives: {drives}"
+                        )
+                        enqueue_event("db", ("start", script['ip'], str(script_status[pid]), script_status[pid]["script_path"], now_str, resources))
+
+                flush_discord_alerts(notifications)
+                time.sleep(4)  # Reduced frequency for production
+
+            except KeyboardInterrupt:
+                logger.info("Monitoring stopped by user")
+                # Alerts buffered before the interrupt still go out
+                flush_discord_alerts(notifications)
+                break
+            except Exception as e:
+                logger.error(f"Critical monitoring error: {e}")
+                # Start/stop alerts buffered before the error were already
+                # applied to script_status, so send them rather than drop them
+                flush_discord_alerts(notifications)
+                enqueue_event("discord", f"🚨 **Monitoring Error**\n{str(e)} in {local_ip}")
+                time.sleep(60)  # Safety sleep on critical failure
+    finally:
+        # Pending stop alerts and DB rows would be lost with the daemon workers
+        drain_event_queues()
+
+
+def log_script_events(events: List[Tuple[str, str, str, str, str, dict]]) -> None:
+    """Log a batch of script events with one executemany per event type and a single commit."""
+    start_rows = []
+    end_rows = []
+    for event_type, localip, pid, path, time, resources_info in events:
         # Convert resources_info dictionary to JSON string
         resources_json = json.dumps(resources_info)
-
         if event_type == "start":
             # Insert a new entry for the start event
-            query = """
-                   INSERT INTO script_event (event_type,ip, pid, script_path, start_time, resources_info)
-                   VALUES (%s, %s, %s, %s, %s, %s)
-               """
-            cursor.execute(query, (event_type,localip, pid, path, time, resources_json))
+            start_rows.append((event_type, localip, pid, path, time, resources_json))
         elif event_type == "end":
             # Update the existing entry for the end event
-            query = """
-                   UPDATE script_event
-                   SET event_type = %s, end_time = %s, resources_info = %s, updated_at = CURRENT_TIMESTAMP
-                   WHERE pid = %s AND event_type = 'start'
-               """
-            cursor.execute(query, (event_type, time, resources_json, pid))
+            end_rows.append((event_type, time, resources_json, pid))
+
+    if not start_rows and not end_rows:
+        return
+
+    try:
+        connection = get_db_connection()
+    except Error as e:
+        logger.error(f"Database connection failed: {e}")
+        return
+
+    try:
+        with connection.cursor() as cursor:
+            # Inserts go first so a start and end in the same batch still pair up
+            if start_rows:
+                cursor.executemany(INSERT_EVENT_SQL, start_rows)
+            if end_rows:
+                cursor.executemany(UPDATE_EVENT_SQL, end_rows)
 
         connection.commit()
     except Error as e:
-        print(f"Database logging failed: {e}")
+        connection.rollback()
+        logger.error(f"Database logging failed: {e}")
+    finally:
+        # Returns the connection to the pool
+        connection.close()
 
 
 def get_local_ip() -> str:
     """Get IPv4 address, preferring Wi-Fi over Ethernet, skipping virtual/disconnected adapters."""
-    try:
-        # Run ipconfig and get output
-        result = subprocess.run(
-            ["ipconfig"],
-            capture_output=True,
-            text=True,
-            shell=True,
-        )
-        output = result.stdout.replace('\r', '')  # Normalize newlines
-
-        # Split on adapter sections
-        adapter_blocks = re.split(r"\n(?=\S.*adapter .+:)", output)
+    global _ip_cache
+    now = time.time()
+    if _ip_cache[1] is not None and now - _ip_cache[0] < IP_CACHE_TTL:
+        return _ip_cache[1]
 
+    try:
+        stats = psutil.net_if_stats()
         wifi_ip = None
         ethernet_ip = None
 
-        for block in adapter_blocks:
+        for name, addrs in psutil.net_if_addrs().items():
             # Skip unwanted/virtual/disconnected adapters
-            if ("Media disconnected" in block or
-                "vEthernet" in block or
-                "Virtual" in block or
-                "VPN" in block or
-                "Loopback" in block):
+            if (name not in stats or not stats[name].isup or
+                "vEthernet" in name or
+                "Virtual" in name or
+                "VPN" in name or
+                "Loopback" in name):
                 continue
 
-            # Prefer Wi-Fi
-            if "Wireless LAN adapter Wi-Fi" in block:
-                match = re.search(r"IPv4 Address[ .:]+([\d.]+)", block)
-                if match:
-                    wifi_ip = match.group(1)
-
-            # Fallback to Ethernet
-            elif "Ethernet adapter Ethernet" in block:
-                match = re.search(r"IPv4 Address[ .:]+([\d.]+)", block)
-                if match:
-                    ethernet_ip = match.group(1)
-
-        return wifi_ip or ethernet_ip or "N/A"
+            for addr in addrs:
+                if addr.family != socket.AF_INET:
+                    continue
+                # Prefer Wi-Fi
+                if "Wi-Fi" in name:
+                    wifi_ip = wifi_ip or addr.address
+                # Fallback to Ethernet
+                elif "Ethernet" in name:
+                    ethernet_ip = ethernet_ip or addr.address
+
+        ip = wifi_ip or ethernet_ip or "N/A"
+        _ip_cache = (now, ip)
+        return ip
 
     except Exception as e:
         return f"Error: {e}"